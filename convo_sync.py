@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 """
 ConvoSync CLI - Command-line interface for conversation data processing
+
+The processing modules are imported inside each command so that `--help` and
+argument errors don't pay for loading them.
 """
 
+import os
 from pathlib import Path
 from typing import Optional
 
 import typer
 from typing_extensions import Annotated
 
-from src.cleaners import JSONCleaner
-from src.converters import MarkdownConverter
-
 app = typer.Typer(
     name="convo_sync",
     help="🚀 AI Conversation Data Processing Toolkit - Clean and convert Google AI Studio conversation data",
@@ -39,12 +40,22 @@ def clean(
         bool,
         typer.Option("--stats", help="Show statistics after cleaning"),
     ] = False,
+    stream: Annotated[
+        bool,
+        typer.Option("--stream", help="Stream-parse large inputs with ijson to keep memory flat"),
+    ] = False,
+    pretty: Annotated[
+        bool,
+        typer.Option("--pretty", help="Indent the cleaned JSON for reading (default: compact)"),
+    ] = False,
 ) -> None:
     """
     🧹 Clean and normalize JSON data from Google AI Studio.
 
     Removes thinking process and code blocks by default to reduce token usage.
     """
+    from src.cleaners import JSONCleaner
+
     typer.echo(f"🔄 Cleaning JSON file: {input_file}")
 
     if not input_file.exists():
@@ -60,6 +71,8 @@ def clean(
         str(output_file),
         remove_thinking=remove_thinking,
         remove_code_blocks=remove_code,
+        stream=stream,
+        indent=2 if pretty else None,
     )
     cleaner.clean()
 
@@ -93,12 +106,18 @@ def convert(
         bool,
         typer.Option("--stats", help="Show statistics after conversion"),
     ] = False,
+    stream: Annotated[
+        bool,
+        typer.Option("--stream", help="Stream-parse large inputs with ijson to keep memory flat"),
+    ] = False,
 ) -> None:
     """
     📝 Convert cleaned JSON to Markdown format.
 
     Generates human-readable conversation records.
     """
+    from src.converters import MarkdownConverter
+
     typer.echo(f"🔄 Converting to Markdown: {input_file}")
 
     if not input_file.exists():
@@ -108,7 +127,7 @@ def convert(
     output_file = output or input_file.with_suffix(".md")
     remove_thinking = not keep_thinking
 
-    converter = MarkdownConverter(str(input_file), str(output_file), remove_thinking)
+    converter = MarkdownConverter(str(input_file), str(output_file), remove_thinking, stream=stream)
     result_file = converter.convert()
 
     typer.secho(f"✅ Markdown saved to: {result_file}", fg=typer.colors.GREEN)
@@ -146,12 +165,33 @@ def pipeline(
         bool,
         typer.Option("--stats", help="Show statistics after each step"),
     ] = False,
+    skip_clean_output: Annotated[
+        bool,
+        typer.Option("--skip-clean-output", help="Don't write the intermediate cleaned JSON file"),
+    ] = False,
+    force: Annotated[
+        bool,
+        typer.Option("--force", "-f", help="Rerun even if the input is unchanged since the last run"),
+    ] = False,
+    stream: Annotated[
+        bool,
+        typer.Option("--stream", help="Stream-parse large inputs with ijson to keep memory flat"),
+    ] = False,
+    pretty: Annotated[
+        bool,
+        typer.Option("--pretty", help="Indent the cleaned JSON for reading (default: compact)"),
+    ] = False,
 ) -> None:
     """
     ⚡ Run full clean→convert pipeline.
 
-    This is the recommended workflow for most users.
+    This is the recommended workflow for most users. Unchanged inputs whose
+    outputs are still in place are skipped unless --force or --stats is given.
     """
+    from src.cache import PipelineCache
+    from src.cleaners import JSONCleaner
+    from src.converters import MarkdownConverter
+
     typer.secho("🚀 Running ConvoSync Pipeline...", fg=typer.colors.BLUE, bold=True)
     typer.echo(f"📄 Input: {input_file}")
 
@@ -163,20 +203,45 @@ def pipeline(
         typer.secho(f"❌ Error: Input must be a file, not a directory: {input_file}", fg=typer.colors.RED, err=True)
         raise typer.Exit(1)
 
+    if stream and skip_clean_output:
+        typer.secho(
+            "❌ Error: --stream converts from the cleaned JSON file, so it can't be combined with --skip-clean-output",
+            fg=typer.colors.RED,
+            err=True,
+        )
+        raise typer.Exit(1)
+
     remove_thinking = not keep_thinking
     remove_code = not keep_code
+    clean_out = clean_output or input_file.with_suffix(".cleaned.json")
+    md_out = md_output or input_file.with_suffix(".md")
+
+    # The fastest run is no run: skip inputs already processed with the same options
+    cache = PipelineCache(md_out.parent)
+    settings = {"remove_thinking": remove_thinking, "remove_code": remove_code, "pretty": pretty}
+    outputs = [md_out] if skip_clean_output else [clean_out, md_out]
+    if not (force or stats) and cache.is_up_to_date(input_file, settings, outputs):
+        typer.secho("⏭️  Input unchanged since the last run, outputs are up to date", fg=typer.colors.GREEN)
+        typer.echo("   (use --force to rerun)")
+        return
+    # Snapshot the input before reading it, so edits made mid-run aren't recorded as processed
+    snapshot = cache.snapshot(input_file)
 
     # Step 1: Clean
     typer.echo("\n📋 Step 1: Cleaning JSON...")
-    clean_out = clean_output or input_file.with_suffix(".cleaned.json")
     cleaner = JSONCleaner(
         str(input_file),
         str(clean_out),
         remove_thinking=remove_thinking,
         remove_code_blocks=remove_code,
+        stream=stream,
+        indent=2 if pretty else None,
     )
-    cleaner.clean()
-    typer.secho(f"✅ Cleaned: {clean_out}", fg=typer.colors.GREEN)
+    cleaned_data = cleaner.clean(save=not skip_clean_output)
+    if skip_clean_output:
+        typer.secho("✅ Cleaned (in memory)", fg=typer.colors.GREEN)
+    else:
+        typer.secho(f"✅ Cleaned: {clean_out}", fg=typer.colors.GREEN)
     if remove_thinking:
         typer.echo("   🧠 Thinking process removed")
     if remove_code:
@@ -184,10 +249,15 @@ def pipeline(
 
     # Step 2: Convert
     typer.echo("\n📋 Step 2: Converting to Markdown...")
-    md_out = md_output or input_file.with_suffix(".md")
-    converter = MarkdownConverter(str(clean_out), str(md_out), False)  # Already removed in clean step
+    if stream:
+        # Streamed chunks only exist on disk, so stream them back in from the cleaned file
+        converter = MarkdownConverter(str(clean_out), str(md_out), False, stream=True)
+    else:
+        # Hand the cleaned data over in memory instead of re-parsing the file we just wrote
+        converter = MarkdownConverter.from_data(cleaned_data, str(md_out), False)  # Already removed in clean step
     converter.convert()
     typer.secho(f"✅ Converted: {md_out}", fg=typer.colors.GREEN)
+    cache.record(input_file, snapshot, settings, outputs)
 
     # Statistics
     if stats:
@@ -206,6 +276,87 @@ def pipeline(
     typer.secho("\n✨ Done! Your conversation is ready.", fg=typer.colors.GREEN, bold=True)
 
 
+def _run_pipeline(input_file: str, remove_thinking: bool, remove_code: bool) -> str:
+    """Clean and convert one file; runs inside a batch worker process.
+
+    Returns:
+        Path of the generated Markdown file.
+    """
+    from src.cleaners import JSONCleaner
+    from src.converters import MarkdownConverter
+
+    input_path = Path(input_file)
+    cleaner = JSONCleaner(
+        input_file,
+        str(input_path.with_suffix(".cleaned.json")),
+        remove_thinking=remove_thinking,
+        remove_code_blocks=remove_code,
+    )
+    md_out = str(input_path.with_suffix(".md"))
+    MarkdownConverter.from_data(cleaner.clean(), md_out, False).convert()
+    return md_out
+
+
+@app.command()
+def batch(
+    input_files: Annotated[list[Path], typer.Argument(help="Input JSON files (e.g. exports/*.json)")],
+    keep_thinking: Annotated[
+        bool,
+        typer.Option("--keep-thinking", help="Keep AI thinking process (default: remove)"),
+    ] = False,
+    keep_code: Annotated[
+        bool,
+        typer.Option("--keep-code", help="Keep code blocks (default: remove)"),
+    ] = False,
+    workers: Annotated[
+        Optional[int],
+        typer.Option("--workers", "-j", min=1, help="Number of worker processes (default: CPU count)"),
+    ] = None,
+) -> None:
+    """
+    📦 Run the clean→convert pipeline over many files in parallel.
+
+    Each file is processed independently in its own worker process.
+    """
+    # Loading the process pool pulls in multiprocessing, so only batch pays for it
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    files = []
+    for input_file in input_files:
+        if input_file.name.endswith(".cleaned.json"):
+            typer.echo(f"⏭️  Skipping cleaned output: {input_file}")
+        elif not input_file.is_file():
+            typer.secho(f"❌ Error: File not found: {input_file}", fg=typer.colors.RED, err=True)
+            raise typer.Exit(1)
+        else:
+            files.append(str(input_file))
+
+    if not files:
+        typer.secho("❌ Error: No input files to process", fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+
+    max_workers = min(workers or os.cpu_count() or 1, len(files))
+    typer.secho(f"🚀 Processing {len(files)} files with {max_workers} workers...", fg=typer.colors.BLUE, bold=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_run_pipeline, f, not keep_thinking, not keep_code): f for f in files}
+        for future in as_completed(futures):
+            try:
+                md_out = future.result()
+            except Exception as e:  # noqa: BLE001 - report per-file failures and keep going
+                failed += 1
+                typer.secho(f"❌ {futures[future]}: {e}", fg=typer.colors.RED, err=True)
+            else:
+                typer.secho(f"✅ {futures[future]} → {md_out}", fg=typer.colors.GREEN)
+
+    if failed:
+        typer.secho(f"\n⚠️  {failed} of {len(files)} files failed", fg=typer.colors.YELLOW, err=True)
+        raise typer.Exit(1)
+
+    typer.secho(f"\n✨ Done! {len(files)} conversations processed.", fg=typer.colors.GREEN, bold=True)
+
+
 def main() -> None:
     """Entry point for the CLI application."""
     app()
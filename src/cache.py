@@ -0,0 +1,142 @@
+"""
+Pipeline Cache Module - 流水线缓存模块
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+CACHE_FILE_NAME = ".convo_sync_cache.json"
+
+
+def _file_sha256(path: Path) -> str:
+    """Hash a file's contents with SHA-256 without loading it into memory."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _output_state(path: Path) -> dict:
+    """Identify an output file by its path, size and modification time."""
+    st = os.stat(path)
+    return {"path": str(path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class PipelineCache:
+    """Remember finished pipeline runs so unchanged inputs can be skipped.
+
+    Runs are recorded in a JSON sidecar file (``.convo_sync_cache.json``) next
+    to the outputs, keyed by the resolved input path. A run is up to date when
+    the same settings produced the same outputs, untouched since (same size and
+    modification time), from an input whose content hasn't changed since.
+
+    Checking an input is cheap: a matching size and modification time is
+    trusted as-is, and only when the modification time moved (e.g. the file
+    was touched or copied) is the content re-hashed and compared with the
+    recorded SHA-256.
+
+    Attributes:
+        cache_file (Path): Path of the JSON sidecar file.
+
+    Example:
+        >>> cache = PipelineCache(Path("exports"))
+        >>> if not cache.is_up_to_date(input_path, settings, outputs):
+        ...     snapshot = cache.snapshot(input_path)
+        ...     run_pipeline()
+        ...     cache.record(input_path, snapshot, settings, outputs)
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        """Initialize the cache stored in ``cache_dir``.
+
+        Args:
+            cache_dir: Directory holding the sidecar file, usually the
+                directory the pipeline writes its outputs to.
+        """
+        self.cache_file = cache_dir / CACHE_FILE_NAME
+
+    def _load(self) -> dict:
+        """Read all recorded runs; a missing or unreadable cache is empty."""
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    @staticmethod
+    def snapshot(input_file: Path) -> dict:
+        """Capture the input's size, modification time and content hash.
+
+        Take the snapshot before the pipeline reads the input, so that edits
+        made while it runs don't get recorded against outputs built from the
+        old content.
+
+        Args:
+            input_file: Pipeline input file.
+
+        Returns:
+            dict: ``size``, ``mtime_ns`` and ``sha256`` of the input.
+        """
+        st = os.stat(input_file)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _file_sha256(input_file)}
+
+    def is_up_to_date(self, input_file: Path, settings: dict, outputs: list[Path]) -> bool:
+        """Check whether a previous run already produced these outputs.
+
+        Args:
+            input_file: Pipeline input file.
+            settings: Options that affect the outputs; must match the recorded run.
+            outputs: Output files of the run; each must still have the size and
+                modification time it was recorded with.
+
+        Returns:
+            bool: True if the recorded run can be reused as-is.
+        """
+        entries = self._load()
+        entry = entries.get(str(input_file.resolve()))
+        if not entry or entry.get("settings") != settings:
+            return False
+        try:
+            if entry.get("outputs") != [_output_state(p) for p in outputs]:
+                return False
+        except OSError:  # an output is gone
+            return False
+
+        st = os.stat(input_file)
+        if st.st_size != entry.get("size"):
+            return False
+        if st.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+
+        # Touched but possibly unchanged: fall back to comparing content
+        if _file_sha256(input_file) != entry.get("sha256"):
+            return False
+        entry["mtime_ns"] = st.st_mtime_ns
+        self._save(entries)
+        return True
+
+    def record(self, input_file: Path, snapshot: dict, settings: dict, outputs: list[Path]) -> None:
+        """Record a finished run.
+
+        Args:
+            input_file: Pipeline input file.
+            snapshot: State of the input from snapshot(), taken before the run.
+            settings: Options that affected the outputs.
+            outputs: Output files the run wrote.
+        """
+        entries = self._load()
+        entries[str(input_file.resolve())] = {
+            **snapshot,
+            "settings": settings,
+            "outputs": [_output_state(p) for p in outputs],
+        }
+        self._save(entries)
+
+    def _save(self, entries: dict) -> None:
+        """Write the cache; failures only cost a rerun next time, so they are ignored."""
+        try:
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass
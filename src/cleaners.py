@@ -7,6 +7,86 @@ JSON Cleaning Module - 数据清理模块
 
 import json
 import re
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from string import ascii_letters as _ASCII_LETTERS
+from types import ModuleType
+from typing import Any, ClassVar
+
+try:
+    from orjson import OPT_INDENT_2
+    from orjson import dumps as _orjson_dumps
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is an optional accelerator (pip install convo_sync[fast])
+    from json import loads as _json_loads  # type: ignore[assignment]
+
+    _orjson_dumps = None  # type: ignore[assignment]
+
+# 流式清理逐块写出许多小片段，用 64 KiB 写缓冲合并系统调用
+_STREAM_WRITE_BUFFER_SIZE = 64 * 1024
+
+# 顶层需要原样保留的模型配置字段（按输出顺序）
+_PRESERVED_KEYS = ("runSettings", "systemInstruction")
+
+# 纯文本块可能的字段排列；与清理后输出的字段顺序一致时可原样复用
+_PLAIN_TEXT_LAYOUTS = frozenset({("text",), ("role", "text"), ("tokenCount", "text"), ("role", "tokenCount", "text")})
+
+# 函数调用模式，模块加载时编译一次
+_FUNC_CALL_RE = re.compile(r"\w+\([^)]*\)")
+_CJK_FUNC_CALL_RE = re.compile(r"[\u4e00-\u9fa5]+\([^)]*\)")
+
+# 只缓存不超过该长度的文本的代码块清理结果，长文本不进缓存，避免缓存占住大量内存
+_CODE_BLOCK_CACHE_MAX_LEN = 4096
+
+
+def _dumps(data: Any, indent: int | None) -> bytes:
+    """Serialize ``data`` to UTF-8 JSON bytes, compact unless ``indent`` is set."""
+    # orjson only supports compact output and a 2-space indent
+    if _orjson_dumps is not None and indent in (None, 2):
+        return _orjson_dumps(data, option=OPT_INDENT_2 if indent == 2 else 0)
+    separators = (",", ":") if indent is None else None
+    return json.dumps(data, ensure_ascii=False, indent=indent, separators=separators).encode("utf-8")
+
+
+def _count_chunk(counts: dict[str, int], chunk: dict) -> None:
+    """Add one cleaned chunk to the ``total``/``users``/``models``/``files`` tallies."""
+    counts["total"] += 1
+    role = chunk.get("role")
+    if role == "user":
+        counts["users"] += 1
+    elif role == "model":
+        counts["models"] += 1
+    if "driveDocument" in chunk:
+        counts["files"] += 1
+
+
+def _import_ijson() -> ModuleType:
+    """Import ijson lazily; it is only needed for streaming mode."""
+    try:
+        import ijson
+    except ImportError as e:
+        msg = "Streaming mode requires ijson (pip install convo_sync[stream])"
+        raise ImportError(msg) from e
+    module: ModuleType = ijson
+    return module
+
+
+def _build_keyword_pattern(keywords: Iterable[str]) -> str:
+    """把关键字按公共前缀合并成一个正则分支，一次扫描即可命中任意关键字."""
+    groups: dict[str, list[str]] = {}
+    for keyword in keywords:
+        groups.setdefault(keyword[:1], []).append(keyword[1:])
+
+    branches = []
+    for head, tails in sorted(groups.items()):
+        if not head:
+            branches.append("")
+        elif len(tails) == 1:
+            branches.append(re.escape(head + tails[0]))
+        else:
+            branches.append(re.escape(head) + _build_keyword_pattern(tails))
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
 
 
 class JSONCleaner:
@@ -27,7 +107,9 @@ class JSONCleaner:
         output_file (str): Path to the output cleaned JSON file.
         remove_thinking (bool): Whether to remove thinking process chunks.
         remove_code_blocks (bool): Whether to remove detected code blocks.
-        data (dict): The loaded and processed JSON data.
+        stream (bool): Whether to stream-parse the input with ijson.
+        indent (int | None): Indentation of the output JSON; None writes it compact.
+        cleaned_data (dict | None): The cleaned data from the last clean() call.
 
     Example:
         >>> cleaner = JSONCleaner("conversation.json", remove_thinking=True)
@@ -40,34 +122,113 @@ class JSONCleaner:
         be re-imported after processing.
     """
 
+    # 明确标注为编程语言的代码块直接移除
+    _LANGS: ClassVar[frozenset[str]] = frozenset(
+        {
+            "python",
+            "javascript",
+            "typescript",
+            "java",
+            "cpp",
+            "c",
+            "rust",
+            "go",
+            "ruby",
+            "php",
+            "shell",
+            "bash",
+            "sql",
+            "html",
+            "css",
+            "json",
+            "yaml",
+            "xml",
+            "markdown",
+            "code",
+        }
+    )
+
+    # 代码关键字（常见编程语言）
+    _CODE_KEYWORDS: ClassVar[frozenset[str]] = frozenset(
+        {
+            "def ",
+            "class ",
+            "import ",
+            "from ",
+            "return ",
+            "function ",
+            "const ",
+            "let ",
+            "var ",
+            "if ",
+            "else ",
+            "for ",
+            "while ",
+            "async ",
+            "await ",
+            "try ",
+            "catch ",
+            "throw ",
+            "new ",
+            "this.",
+            "self.",
+            "public ",
+            "private ",
+            "protected ",
+            "static ",
+            "void ",
+            "int ",
+            "string ",
+            "bool ",
+        }
+    )
+
+    _CODE_KEYWORD_RE: ClassVar[re.Pattern[str]] = re.compile(_build_keyword_pattern(_CODE_KEYWORDS))
+
+    # 代码特征符号
+    _CODE_SYMBOLS: ClassVar[tuple[str, ...]] = ("{", "}", "()", "[]", "=>", "->", "==", "!=", "<=", ">=")
+
     def __init__(
         self,
         input_file: str,
         output_file: str | None = None,
         remove_thinking: bool = True,
         remove_code_blocks: bool = True,
+        stream: bool = False,
+        indent: int | None = None,
     ) -> None:
         """Initialize the JSON cleaner with configuration.
 
         Args:
             input_file: Path to the input JSON file from Google AI Studio.
             output_file: Path for the cleaned JSON output. If None, automatically
-                generates filename by appending '.cleaned' before extension.
+                generates filename by replacing the extension with '.cleaned.json'.
             remove_thinking: If True, removes chunks marked as thinking process
                 (isThought: true) and parts with thought: true flag. Default is True.
             remove_code_blocks: If True, applies heuristic algorithm to detect and
                 remove code blocks while preserving descriptive text. Default is True.
+            stream: If True, cleans chunks one at a time with ijson and writes them
+                straight to the output file instead of loading the whole document.
+                Requires the optional ijson dependency. Default is False.
+            indent: Number of spaces to indent the output JSON with. Default is
+                None, which writes compact JSON with no whitespace; the cleaned
+                file is meant for re-import rather than reading.
 
         Raises:
             FileNotFoundError: If input_file does not exist.
             json.JSONDecodeError: If input_file is not valid JSON.
         """
         self.input_file = input_file
-        self.output_file = output_file or input_file.replace(".json", ".cleaned.json")
+        self.output_file = output_file or str(Path(input_file).with_suffix(".cleaned.json"))
         self.remove_thinking = remove_thinking
         self.remove_code_blocks = remove_code_blocks
+        self.stream = stream
+        self.indent = indent
+        self.cleaned_data: dict | None = None
+        # 流式清理时结果不留在内存中，边写边统计，get_stats() 无需重新解析输出文件
+        self._stream_counts: dict[str, int] | None = None
 
-    def clean(self) -> dict:
+    def clean(self, save: bool = True) -> dict:
         """Execute the cleaning process and save results.
 
         This method orchestrates the entire cleaning workflow:
@@ -76,42 +237,135 @@ class JSONCleaner:
             3. Removes thinking process chunks (if enabled)
             4. Removes code blocks using heuristic detection (if enabled)
             5. Preserves model configuration and file references
-            6. Saves the cleaned data to output file
+            6. Saves the cleaned data to output file (if save is True)
+
+        Args:
+            save: If False, skips writing the output file. Useful when the result
+                is handed straight to MarkdownConverter.from_data(). Default is True.
 
         Returns:
             dict: The cleaned conversation data dictionary with the same structure
-                as Google AI Studio format, ready for re-import.
+                as Google AI Studio format, ready for re-import. In streaming mode
+                the cleaned chunks only go to the output file, so the returned
+                dict holds the preserved model configuration alone.
 
         Raises:
             FileNotFoundError: If the input file does not exist.
             json.JSONDecodeError: If the input file contains invalid JSON.
             IOError: If unable to write to the output file.
+            ValueError: If streaming mode is combined with save=False.
 
         Example:
             >>> cleaner = JSONCleaner("input.json", remove_thinking=True)
             >>> result = cleaner.clean()
             >>> print(f"Cleaned file saved with {len(result['chunkedPrompt']['chunks'])} chunks")
         """
+        if self.stream:
+            if not save:
+                raise ValueError("Streaming mode writes cleaned chunks straight to the output file")
+            self.cleaned_data = None
+            self._stream_counts = None
+            return self._clean_streaming()
+
+        self._stream_counts = None
         data = self._load_json_file()
         cleaned_data = self._process_google_ai_studio_format(data)
-        self._save_json_file(cleaned_data)
+        if save:
+            self._save_json_file(cleaned_data)
+        self.cleaned_data = cleaned_data
         return cleaned_data
 
     def _load_json_file(self) -> dict:
         """Load and parse JSON file."""
         try:
-            with open(self.input_file, encoding="utf-8") as f:
-                data: dict = json.load(f)
+            with open(self.input_file, "rb") as f:
+                data: dict = _json_loads(f.read())
                 return data
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalisd JSON file: {e}") from e
         except FileNotFoundError as e:
             raise FileNotFoundError(f"Input file not found: {self.input_file}") from e
 
-    def _save_json_file(self, data):
+    def _clean_streaming(self) -> dict:
+        """Clean the input file incrementally with ijson.
+
+        A first event-only pass collects the preserved model configuration
+        without building any chunks; a second pass then cleans chunks one at a
+        time and writes them straight to the output file, so peak memory stays
+        bounded by the largest single chunk. The output is byte-identical to
+        the non-streaming path.
+
+        Returns:
+            dict: The preserved model configuration (runSettings, systemInstruction).
+
+        Raises:
+            ImportError: If ijson is not installed
+            ValueError: If the input is invalid JSON
+        """
+        ijson = _import_ijson()
+        builders = {key: ijson.ObjectBuilder() for key in _PRESERVED_KEYS}
+        top_level_keys: set[str] = set()
+
+        try:
+            with open(self.input_file, "rb") as f:
+                for prefix, event, value in ijson.parse(f, use_float=True):
+                    if not prefix:
+                        if event == "map_key":
+                            top_level_keys.add(value)
+                        continue
+                    builder = builders.get(prefix.partition(".")[0])
+                    if builder is not None:
+                        builder.event(event, value)
+        except ijson.JSONError as e:
+            raise ValueError(f"Invalid JSON file: {e}") from e
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Input file not found: {self.input_file}") from e
+
+        settings = {key: builders[key].value for key in _PRESERVED_KEYS if key in top_level_keys}
+        has_chunked_prompt = "chunkedPrompt" in top_level_keys
+
+        # 逐段写出与 _save_json_file 完全相同的布局：每个值先单独序列化，再按所在深度缩进
+        indent = self.indent
+        colon = b":" if indent is None else b": "
+
+        def newline(depth: int) -> bytes:
+            return b"" if indent is None else b"\n" + b" " * (indent * depth)
+
+        def dump_at(value: Any, depth: int) -> bytes:
+            data = _dumps(value, indent)
+            return data if indent is None else data.replace(b"\n", newline(depth))
+
+        counts = {"total": 0, "users": 0, "models": 0, "files": 0}
+        with open(self.output_file, "wb", buffering=_STREAM_WRITE_BUFFER_SIZE) as out:
+            out.write(b"{")
+            separator = newline(1)
+            for key, value in settings.items():
+                out.write(separator + _dumps(key, None) + colon + dump_at(value, 1))
+                separator = b"," + newline(1)
+
+            if has_chunked_prompt:
+                out.write(separator + b'"chunkedPrompt"' + colon + b"{" + newline(2) + b'"chunks"' + colon + b"[")
+                item_separator = newline(3)
+                with open(self.input_file, "rb") as f:
+                    for chunk in ijson.items(f, "chunkedPrompt.chunks.item", use_float=True):
+                        cleaned_chunk = self._clean_chunk(chunk)
+                        if cleaned_chunk:
+                            out.write(item_separator + dump_at(cleaned_chunk, 3))
+                            item_separator = b"," + newline(3)
+                            _count_chunk(counts, cleaned_chunk)
+                out.write((newline(2) if counts["total"] else b"") + b"]" + newline(1) + b"}")
+
+            out.write((newline(0) if settings or has_chunked_prompt else b"") + b"}")
+
+        self._stream_counts = counts
+        return settings
+
+    def _save_json_file(self, data: dict) -> None:
         """Save cleaned data to JSON file."""
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 一次性序列化为 bytes 后单次写出，不经过文本层逐段编码
+        payload = _dumps(data, self.indent)
+        with open(self.output_file, "wb") as f:
+            f.write(payload)
 
     def _process_google_ai_studio_format(self, data: dict) -> dict:
         """Process Google AI Studio exported JSON format.
@@ -144,40 +398,37 @@ class JSONCleaner:
 
         return cleaned_data
 
-    def _process_chunks(self, chunks):
-        """Process and clean chunks array."""
-        cleaned_chunks = []
+    def _process_chunks(self, chunks: list[dict]) -> list[dict]:
+        """Process and clean chunks array, dropping chunks _clean_chunk() rejects."""
+        return [chunk for chunk in map(self._clean_chunk, chunks) if chunk]
 
-        for chunk in chunks:
-            # 保留文件引用（driveDocument）
-            if "driveDocument" in chunk:
-                cleaned_chunks.append(chunk)
-                continue
+    def _clean_chunk(self, chunk: dict) -> dict | None:
+        """Clean one chunk, returning None if it should be dropped."""
+        # 保留文件引用（driveDocument）
+        if "driveDocument" in chunk:
+            return chunk
 
-            # 跳过思考过程
-            if self.remove_thinking and chunk.get("isThought"):
-                continue
-
-            # 处理普通消息
-            cleaned_chunk = self._process_single_chunk(chunk)
-            if cleaned_chunk:
-                cleaned_chunks.append(cleaned_chunk)
+        # 跳过思考过程
+        if self.remove_thinking and chunk.get("isThought"):
+            return None
 
-        return cleaned_chunks
+        # 处理普通消息
+        return self._process_single_chunk(chunk)
 
-    def _process_single_chunk(self, chunk):
+    def _process_single_chunk(self, chunk: dict) -> dict | None:
         """Process a single chunk."""
-        cleaned_chunk = {}
+        # 只含基本字段且无需去除代码块的纯文本块，清理结果与原块完全相同，直接复用
+        if tuple(chunk) in _PLAIN_TEXT_LAYOUTS and not (self.remove_code_blocks and "```" in chunk["text"]):
+            return chunk
 
         # 复制基本字段
-        for key in ["role", "tokenCount"]:
-            if key in chunk:
-                cleaned_chunk[key] = chunk[key]
+        cleaned_chunk = {key: chunk[key] for key in ("role", "tokenCount") if key in chunk}
 
         # 处理文本内容
         if "text" in chunk:
             text = chunk["text"]
-            if self.remove_code_blocks:
+            # 没有围栏的纯文本无需扫描
+            if self.remove_code_blocks and "```" in text:
                 text = self._remove_code_blocks(text)
             cleaned_chunk["text"] = text
 
@@ -193,7 +444,7 @@ class JSONCleaner:
 
         return cleaned_chunk
 
-    def _process_parts(self, parts):
+    def _process_parts(self, parts: list[dict]) -> list[dict[str, str]]:
         """Process parts array, filtering out thinking parts."""
         cleaned_parts = []
 
@@ -205,13 +456,14 @@ class JSONCleaner:
             # 处理普通文本片段
             if "text" in part:
                 text = part["text"]
-                if self.remove_code_blocks:
+                if self.remove_code_blocks and "```" in text:
                     text = self._remove_code_blocks(text)
                 cleaned_parts.append({"text": text})
 
         return cleaned_parts
 
-    def _remove_code_blocks(self, text):
+    @classmethod
+    def _remove_code_blocks(cls, text: str) -> str:
         """Remove code blocks from text while preserving structure.
 
         智能检测：只移除包含代码的块，保留纯文本/总结。
@@ -221,50 +473,71 @@ class JSONCleaner:
         - 可选的语言标识符
         - 代码内容
         - 相同数量的反引号结束
+
+        结果只取决于文本本身，短文本按文本缓存：重复出现的同一段内容只分析一次。
+        超过 _CODE_BLOCK_CACHE_MAX_LEN 的长文本每次直接扫描，缓存最多占用
+        1024 条短文本的内存，不会破坏流式清理的内存上限。
         """
-        # 改进的正则：不强制要求换行符，支持更多格式
-        pattern = r"(`{3,})([a-zA-Z]*)\s*(.*?)\s*\1"
-
-        def replace_code_block(match):
-            """根据内容决定是否移除代码块"""
-            language = match.group(2)  # 语言标识符
-            content = match.group(3)  # 块内容
-
-            # 如果明确指定了编程语言，直接移除
-            if language and language.lower() in {
-                "python",
-                "javascript",
-                "typescript",
-                "java",
-                "cpp",
-                "c",
-                "rust",
-                "go",
-                "ruby",
-                "php",
-                "shell",
-                "bash",
-                "sql",
-                "html",
-                "css",
-                "json",
-                "yaml",
-                "xml",
-                "markdown",
-                "code",
-            }:
-                return ""
-
-            # 智能检测内容是否为代码
-            if self._is_code_content(content):
-                return ""
-
-            # 保留纯文本/总结（去掉围栏，保留内容）
-            return content.strip()
-
-        return re.sub(pattern, replace_code_block, text, flags=re.DOTALL)
-
-    def _is_code_content(self, content):
+        if len(text) > _CODE_BLOCK_CACHE_MAX_LEN:
+            return cls._scan_code_blocks(text)
+        return cls._cached_remove_code_blocks(text)
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _cached_remove_code_blocks(cls, text: str) -> str:
+        """按文本缓存的 _scan_code_blocks()，只用于短文本."""
+        return cls._scan_code_blocks(text)
+
+    @classmethod
+    def _scan_code_blocks(cls, text: str) -> str:
+        """扫描围栏并替换其中的代码块，返回清理后的文本."""
+        pieces: list[str] = []
+        pos = 0
+        size = len(text)
+        while True:
+            start = text.find("```", pos)
+            if start < 0:
+                break
+
+            run_end = start + 3
+            while run_end < size and text[run_end] == "`":
+                run_end += 1
+
+            # 优先使用完整的反引号串作为开始围栏，找不到同长度的结束围栏时逐个缩短
+            for fence_len in range(run_end - start, 2, -1):
+                lang_start = lang_end = start + fence_len
+                while lang_end < size and text[lang_end] in _ASCII_LETTERS:
+                    lang_end += 1
+                close = text.find("`" * fence_len, lang_end)
+                if close >= 0:
+                    break
+            else:
+                # 连三个反引号的结束围栏都没有，后面不可能再有代码块
+                break
+
+            pieces.append(text[pos:start])
+            pieces.append(cls._decide_replacement(text[lang_start:lang_end], text[lang_end:close].strip()))
+            pos = close + fence_len
+
+        pieces.append(text[pos:])
+        return "".join(pieces)
+
+    @classmethod
+    def _decide_replacement(cls, language: str, content: str) -> str:
+        """根据语言标识和内容决定代码块的替换文本."""
+        # 如果明确指定了编程语言，直接移除
+        if language and language.lower() in cls._LANGS:
+            return ""
+
+        # 智能检测内容是否为代码
+        if cls._is_code_content(content):
+            return ""
+
+        # 保留纯文本/总结（去掉围栏，保留内容）
+        return content.strip()
+
+    @classmethod
+    def _is_code_content(cls, content: str) -> bool:
         """检测内容是否为代码.
 
         通过代码特征判断：
@@ -279,68 +552,40 @@ class JSONCleaner:
 
         content_lower = content.lower()
 
-        # 代码关键字（常见编程语言）
-        code_keywords = {
-            "def ",
-            "class ",
-            "import ",
-            "from ",
-            "return ",
-            "function ",
-            "const ",
-            "let ",
-            "var ",
-            "if ",
-            "else ",
-            "for ",
-            "while ",
-            "async ",
-            "await ",
-            "try ",
-            "catch ",
-            "throw ",
-            "new ",
-            "this.",
-            "self.",
-            "public ",
-            "private ",
-            "protected ",
-            "static ",
-            "void ",
-            "int ",
-            "string ",
-            "bool ",
-        }
-
         # 检查是否包含代码关键字
-        if any(keyword in content_lower for keyword in code_keywords):
+        if cls._CODE_KEYWORD_RE.search(content_lower):
             return True
 
-        # 检查是否包含大量代码特征符号
-        code_symbols = ["{", "}", "()", "[]", "=>", "->", "==", "!=", "<=", ">="]
-        symbol_count = sum(content.count(symbol) for symbol in code_symbols)
-        lines = content.split("\n")
+        # 只需要行数，不必把内容切分成行列表
+        line_count = content.count("\n") + 1
 
         # 如果符号密度高（平均每行超过2个符号），可能是代码
+        # 逐个符号累加，一旦超过阈值就不必再数剩下的符号
         symbol_per_line_threshold = 2
-        if len(lines) > 0 and symbol_count / len(lines) > symbol_per_line_threshold:
-            return True
+        symbol_limit = symbol_per_line_threshold * line_count
+        symbol_count = 0
+        for symbol in cls._CODE_SYMBOLS:
+            symbol_count += content.count(symbol)
+            if symbol_count > symbol_limit:
+                return True
 
         # 检查缩进模式（代码通常有规律的缩进）
         min_lines_for_indent_check = 3
         indent_ratio_threshold = 0.5
-        indented_lines = sum(1 for line in lines if line.startswith(("    ", "\t")))
-        if len(lines) > min_lines_for_indent_check and indented_lines / len(lines) > indent_ratio_threshold:
-            return True
+        if line_count > min_lines_for_indent_check:
+            # 缩进行 = 首行缩进 + 换行符后紧跟缩进的次数
+            indented_lines = content.startswith(("    ", "\t")) + content.count("\n    ") + content.count("\n\t")
+            if indented_lines / line_count > indent_ratio_threshold:
+                return True
 
         # 检查是否包含函数调用模式 function_name(...)
         # 但排除常见的中文括号用法
-        return bool(re.search(r"\w+\([^)]*\)", content) and not re.search(r"[\u4e00-\u9fa5]+\([^)]*\)", content))
+        return bool(_FUNC_CALL_RE.search(content) and not _CJK_FUNC_CALL_RE.search(content))
 
     def get_stats(self) -> dict[str, int | bool]:
         """Calculate statistics from the cleaned conversation data.
 
-        Analyzes the output file to provide insights about the cleaned data,
+        Analyzes the cleaned data to provide insights about the cleaned data,
         including message counts, file references, and applied cleaning options.
 
         Returns:
@@ -364,21 +609,24 @@ class JSONCleaner:
             Total: 150, Users: 76
 
         Note:
-            This method reads from the output file, so clean() must be called first.
+            Uses the in-memory result of clean(), or the counts tallied while a
+            streaming clean() wrote its output, and only falls back to reading
+            the output file when neither is available.
         """
-        with open(self.output_file, encoding="utf-8") as f:
-            data = json.load(f)
-
-        chunks = data.get("chunkedPrompt", {}).get("chunks", [])
-        user_count = sum(1 for c in chunks if c.get("role") == "user")
-        model_count = sum(1 for c in chunks if c.get("role") == "model")
-        file_count = sum(1 for c in chunks if "driveDocument" in c)
+        counts = self._stream_counts
+        if counts is None:
+            data = self.cleaned_data
+            if data is None:
+                with open(self.output_file, encoding="utf-8") as f:
+                    data = json.load(f)
+
+            # Tally every category in a single pass over the chunks
+            counts = {"total": 0, "users": 0, "models": 0, "files": 0}
+            for chunk in data.get("chunkedPrompt", {}).get("chunks", []):
+                _count_chunk(counts, chunk)
 
         return {
-            "total": len(chunks),
-            "users": user_count,
-            "models": model_count,
-            "files": file_count,
+            **counts,
             "thinking_removed": self.remove_thinking,
             "code_blocks_removed": self.remove_code_blocks,
         }
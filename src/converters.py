@@ -3,7 +3,124 @@ Markdown Converter Module - Markdown 转换模块
 """
 
 import json
+import mmap
+import os
 import re
+from collections.abc import Callable, Iterable, Iterator
+from operator import itemgetter
+from pathlib import Path
+from types import ModuleType
+from typing import Any, BinaryIO
+
+try:
+    from orjson import loads as _json_loads
+
+    # orjson parses buffer-protocol objects directly, so inputs can be mmapped
+    _PARSE_MMAP = True
+except ImportError:  # orjson is an optional accelerator (pip install convo_sync[fast])
+    from json import loads as _json_loads  # type: ignore[assignment]
+
+    _PARSE_MMAP = False
+
+# Rendered pieces are encoded and written to a raw fd in batches, bypassing
+# the TextIOWrapper/BufferedWriter layers entirely
+_WRITE_BATCH_SIZE = 4096
+_OUTPUT_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+# Constant message templates, pre-encoded to UTF-8 once: every message is emitted
+# as heading + text + separator, so only the text itself is encoded per message.
+# Roles without a heading fall back to their capitalized name.
+_ROLE_HEADINGS: dict[str, bytes] = {"user": b"**Human:**\n\n", "model": b"**Assistant:**\n\n"}
+_MESSAGE_SEPARATOR = b"\n\n---\n---\n\n"
+
+# Both keys are always present on conversations built from chunkedPrompt chunks
+_get_role_and_text = itemgetter("role", "text")
+
+# Text transform patterns, compiled once at import
+_CODE_BLOCK_RE = re.compile(r"^(`{3,})([a-z0-9]*)\s*\n(.*?)\n\1$", re.MULTILINE | re.DOTALL)
+# Runs of exactly three backticks are already normalized, so only match four or more
+_MULTI_FENCE_RE = re.compile(r"````+")
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\n[^\n]")
+_NEWLINES_RE = re.compile(r"\n{3,}")
+
+_FORMAT_ERROR = "JSON file format incorrect: neither 'conversations' nor 'chunkedPrompt.chunks' found"
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of ``data`` to a raw file descriptor, retrying short writes."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _loads_mmap(f: BinaryIO) -> Any:
+    """Parse JSON straight from a read-only mmap of ``f``, avoiding a full copy."""
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):  # empty files and pipes can't be mapped
+        return _json_loads(f.read())
+    with mm, memoryview(mm) as view:
+        return _json_loads(view)
+
+
+def _remove_bold_sections(text: str, section_end: Callable[[str, int], int]) -> str:
+    """Cut every bold-titled section out of ``text`` in one forward pass.
+
+    A section is ``**Title**`` followed by a blank line and a body. This matches
+    ``re.sub`` with a lazy body: candidates are tried at each ``**`` from left
+    to right, and ``section_end(text, body_start)`` returns where the body ends,
+    or -1 if it (and therefore every later candidate) has no end. Only
+    ``str.find`` is used, so there is no backtracking.
+    """
+    pieces: list[str] = []
+    pos = 0
+    start = text.find("**")
+    while start >= 0:
+        title_end = text.find("*", start + 2)
+        if title_end < 0:
+            break
+        if title_end > start + 2 and text.startswith("**\n\n", title_end):
+            end = section_end(text, title_end + 4)
+            if end < 0:
+                break
+            pieces.append(text[pos:start])
+            pos = end
+            start = text.find("**", end)
+        else:
+            start = text.find("**", start + 1)
+
+    if not pieces:
+        return text
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+def _triple_newline_end(text: str, body_start: int) -> int:
+    """End of a section closed by a triple newline (inclusive), or -1."""
+    end = text.find("\n\n\n", body_start)
+    return end + 3 if end >= 0 else -1
+
+
+def _paragraph_end(text: str, body_start: int) -> int:
+    """End of a trailing thinking section: the next paragraph break or the end of text."""
+    # Same stops as the lookahead (?=\n\n[^\n]|$): "$" also matches before a final newline
+    end = len(text)
+    if text.endswith("\n") and end - 1 >= body_start:
+        end -= 1
+    match = _PARAGRAPH_BREAK_RE.search(text, body_start)
+    return min(match.start(), end) if match else end
+
+
+def _import_ijson() -> ModuleType:
+    """Import ijson lazily; it is only needed for streaming mode."""
+    try:
+        import ijson
+    except ImportError as e:
+        msg = "Streaming mode requires ijson (pip install convo_sync[stream])"
+        raise ImportError(msg) from e
+    module: ModuleType = ijson
+    return module
 
 
 class MarkdownConverter:
@@ -23,6 +140,7 @@ class MarkdownConverter:
         input_json_file (str): Path to the input cleaned JSON file.
         output_md_file (str): Path to the output Markdown file.
         remove_thinking (bool): Whether to filter out thinking process content.
+        stream (bool): Whether to stream-parse the input with ijson.
         message_counter (dict): Tracks count of user and model messages.
 
     Example:
@@ -41,6 +159,7 @@ class MarkdownConverter:
         input_json_file: str,
         output_md_file: str | None = None,
         remove_thinking: bool = True,
+        stream: bool = False,
     ) -> None:
         """Initialize the Markdown converter with file paths and options.
 
@@ -48,21 +167,53 @@ class MarkdownConverter:
             input_json_file: Path to input JSON file in Google AI Studio format.
                 Should be a cleaned JSON (processed by JSONCleaner) for best results.
             output_md_file: Path for the Markdown output file. If None, automatically
-                generates filename by replacing '.json' extension with '.md'.
+                generates filename by replacing the file extension with '.md'.
             remove_thinking: If True, excludes parts marked as thinking process
                 (thought: true flag) from the output. Default is True to produce
                 cleaner conversation records.
+            stream: If True, parses the input incrementally with ijson instead of
+                loading the whole document, keeping memory flat for multi-GB
+                exports. Requires the optional ijson dependency. Default is False.
 
         Raises:
             FileNotFoundError: If input_json_file does not exist.
         """
         self.input_json_file = input_json_file
-        default_output = input_json_file.replace(".json", ".md")
-        self.output_md_file = output_md_file or default_output
+        self.output_md_file = output_md_file or str(Path(input_json_file).with_suffix(".md"))
         self.remove_thinking = remove_thinking
-        self.message_counter = {"user": 0, "model": 0}
+        self.stream = stream
+        self.message_counter: dict[str, int] = {"user": 0, "model": 0}
+        self._data: dict | None = None
+
+    @classmethod
+    def from_data(
+        cls,
+        data: dict,
+        output_md_file: str,
+        remove_thinking: bool = True,
+    ) -> "MarkdownConverter":
+        """Create a converter for already-parsed conversation data.
+
+        Lets a pipeline hand JSONCleaner's in-memory result straight to the
+        converter, skipping the serialize/re-parse round trip through disk.
+
+        Args:
+            data: Parsed JSON data in either supported format.
+            output_md_file: Path for the Markdown output file.
+            remove_thinking: If True, removes thinking sections from model messages.
+
+        Returns:
+            MarkdownConverter: A converter whose convert() renders ``data``.
+
+        Example:
+            >>> cleaned = JSONCleaner("input.json").clean(save=False)
+            >>> MarkdownConverter.from_data(cleaned, "output.md").convert()
+        """
+        converter = cls("", output_md_file, remove_thinking)
+        converter._data = data
+        return converter
 
-    def _normalize_code_blocks(self, text):
+    def _normalize_code_blocks(self, text: str) -> str:
         """
         Normalize code block backticks to use proper markdown syntax.
 
@@ -77,11 +228,14 @@ class MarkdownConverter:
         Returns:
             Text with normalized code blocks
         """
+        # Every pass below needs a fence; most chat messages have none
+        if "```" not in text:
+            return text
 
         # First pass: normalize code blocks with any number of backticks
         # Match opening backticks (3+), optional language, content,
         # closing backticks
-        def normalize_block(match):
+        def normalize_block(match: re.Match[str]) -> str:
             language = match.group(2).lower().strip()
             content = match.group(3)
 
@@ -89,21 +243,16 @@ class MarkdownConverter:
             return f"```{language}\n{content.strip()}\n```"
 
         # Pattern: (3+ backticks)(optional language)(content)(same backticks)
-        text = re.sub(
-            r"^(`{3,})([a-z0-9]*)\s*\n(.*?)\n\1$",
-            normalize_block,
-            text,
-            flags=re.MULTILINE | re.DOTALL,
-        )
+        text = _CODE_BLOCK_RE.sub(normalize_block, text)
 
         # Second pass: normalize consecutive triple backticks (merge them)
         # This handles cases where code blocks got duplicated
-        text = re.sub(r"\n```\n```\n", "\n```\n", text)
-        text = re.sub(r"```+", "```", text)
+        text = text.replace("\n```\n```\n", "\n```\n")
+        text = _MULTI_FENCE_RE.sub("```", text)
 
         return text
 
-    def _remove_thinking_sections(self, text):
+    def _remove_thinking_sections(self, text: str) -> str:
         """
         Remove AI thinking process sections from text.
 
@@ -121,25 +270,27 @@ class MarkdownConverter:
         # The thinking section ends with triple newlines (\n\n\n)
         # or another **Bold Title**
 
-        # This regex matches:
+        # Each section is:
         # - **any text** (bold title)
         # - \n\n (double newline after title)
-        # - .*? (non-greedy match for content, including newlines)
+        # - the shortest content (including newlines) up to
         # - \n\n\n (triple newline marking end of section)
-        pattern = r"\*\*[^*]+\*\*\n\n.*?\n\n\n"
-        text = re.sub(pattern, "", text, flags=re.DOTALL)
+        # Both passes need a bold title, and the cleanup needs a triple newline;
+        # substring checks skip whichever work can't match
+        if "**" in text:
+            text = _remove_bold_sections(text, _triple_newline_end)
 
-        # Also remove remaining **Title**\n\n...content at the end
-        # (in case there's no triple newline at the very end)
-        pattern_end = r"\*\*[^*]+\*\*\n\n.*?(?=\n\n[^\n]|$)"
-        text = re.sub(pattern_end, "", text, flags=re.DOTALL)
+            # Also remove remaining **Title**\n\n...content at the end
+            # (in case there's no triple newline at the very end)
+            text = _remove_bold_sections(text, _paragraph_end)
 
         # Clean up excessive newlines (more than 2 consecutive)
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        if "\n\n\n" in text:
+            text = _NEWLINES_RE.sub("\n\n", text)
 
         return text.strip()
 
-    def _load_conversations(self, data):
+    def _load_conversations(self, data: dict) -> list[dict]:
         """
         Load conversations from JSON data.
 
@@ -157,26 +308,89 @@ class MarkdownConverter:
             ValueError: If data format is not recognized
         """
         if "conversations" in data:
-            return data["conversations"]
+            conversations: list[dict] = data["conversations"]
+            return conversations
 
         if "chunkedPrompt" in data and "chunks" in data["chunkedPrompt"]:
             # Convert Google AI Studio format to standard format
-            conversations = []
-            for chunk in data["chunkedPrompt"]["chunks"]:
-                role = chunk.get("role", "unknown")
-                # Try to get text, or merge from parts
-                if "text" in chunk:
-                    text = chunk["text"]
-                elif "parts" in chunk:
-                    # Merge parts into text
-                    text = "".join(part.get("text", "") for part in chunk["parts"])
+            return [self._chunk_to_conversation(chunk) for chunk in data["chunkedPrompt"]["chunks"]]
+
+        raise ValueError(_FORMAT_ERROR)
+
+    @staticmethod
+    def _chunk_to_conversation(chunk: dict) -> dict[str, str]:
+        """Convert a Google AI Studio chunk to a standard conversation dict."""
+        role = chunk.get("role", "unknown")
+        # Try to get text, or merge from parts
+        if "text" in chunk:
+            text = chunk["text"]
+        elif "parts" in chunk:
+            # Merge parts into text; join() materializes its input anyway, so a list beats a generator
+            text = "".join([part.get("text", "") for part in chunk["parts"]])
+        else:
+            text = ""
+        return {"role": role, "text": text}
+
+    def _load_json_file(self) -> dict:
+        """Load and parse the whole input JSON file."""
+        try:
+            with open(self.input_json_file, "rb") as f:
+                data: dict = _loads_mmap(f) if _PARSE_MMAP else _json_loads(f.read())
+                return data
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON file: {e}") from e
+        except FileNotFoundError as e:
+            msg = f"Input file not found: {self.input_json_file}"
+            raise FileNotFoundError(msg) from e
+
+    def _stream_conversations(self) -> tuple[int, Iterator[dict]]:
+        """Stream conversations from the input file with ijson.
+
+        A first event-only pass detects the input format and counts entries for
+        the header without building any objects; the returned iterator then
+        yields one conversation at a time, so peak memory stays bounded by the
+        largest single message instead of the whole file.
+
+        Returns:
+            Tuple of (total conversation count, iterator of conversation dicts)
+
+        Raises:
+            ImportError: If ijson is not installed
+            ValueError: If the input is invalid JSON or in an unknown format
+        """
+        ijson = _import_ijson()
+        counts = {"conversations.item": 0, "chunkedPrompt.chunks.item": 0}
+        has_conversations = has_chunks = False
+
+        try:
+            with open(self.input_json_file, "rb") as f:
+                for prefix, event, value in ijson.parse(f):
+                    if event == "start_map" and prefix in counts:
+                        counts[prefix] += 1
+                    elif event == "map_key":
+                        if prefix == "" and value == "conversations":
+                            has_conversations = True
+                        elif prefix == "chunkedPrompt" and value == "chunks":
+                            has_chunks = True
+        except ijson.JSONError as e:
+            raise ValueError(f"Invalid JSON file: {e}") from e
+        except FileNotFoundError as e:
+            msg = f"Input file not found: {self.input_json_file}"
+            raise FileNotFoundError(msg) from e
+
+        if not has_conversations and not has_chunks:
+            raise ValueError(_FORMAT_ERROR)
+
+        def iter_conversations() -> Iterator[dict]:
+            with open(self.input_json_file, "rb") as f:
+                if has_conversations:
+                    yield from ijson.items(f, "conversations.item")
                 else:
-                    text = ""
-                conversations.append({"role": role, "text": text})
-            return conversations
+                    for chunk in ijson.items(f, "chunkedPrompt.chunks.item"):
+                        yield self._chunk_to_conversation(chunk)
 
-        msg = "JSON file format incorrect: neither 'conversations' nor 'chunkedPrompt.chunks' found"
-        raise ValueError(msg)
+        prefix = "conversations.item" if has_conversations else "chunkedPrompt.chunks.item"
+        return counts[prefix], iter_conversations()
 
     def convert(self) -> str:
         """Convert JSON conversation data to formatted Markdown document.
@@ -210,78 +424,106 @@ class MarkdownConverter:
             The method automatically detects and handles both standard conversation
             format and Google AI Studio's chunkedPrompt format.
         """
-        try:
-            with open(self.input_json_file, encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON file: {e}") from e
-        except FileNotFoundError as e:
-            msg = f"Input file not found: {self.input_json_file}"
-            raise FileNotFoundError(msg) from e
+        conversations: Iterable[dict]
+        if self._data is not None:
+            conversations = self._load_conversations(self._data)
+            total = len(conversations)
+        elif self.stream:
+            total, conversations = self._stream_conversations()
+        else:
+            conversations = self._load_conversations(self._load_json_file())
+            total = len(conversations)
+
+        self._write_markdown(conversations, total)
+        return self.output_md_file
 
-        conversations = self._load_conversations(data)
-        self.message_counter = {"user": 0, "model": 0}
+    def _build_renderer(self) -> Callable[[str, str], tuple[bytes, bytes, bytes] | None]:
+        """Build a message renderer specialized for this converter's options.
 
-        with open(self.output_md_file, "w", encoding="utf-8") as f:
-            # Write header
-            f.write("# Conversation Log\n\n")
-            f.write(f"> Total {len(conversations)} messages\n\n")
-            f.write("---\n\n")
+        Options, bound methods and the heading table are resolved once here and
+        captured by the closure, so rendering a message does no attribute or
+        global lookups.
+
+        Returns:
+            Function taking a lowercased role and stripped, non-empty text and
+            returning the UTF-8 encoded (heading, text, separator) pieces of the
+            Markdown section, or None if nothing is left after thinking removal.
+        """
+        remove_thinking = self.remove_thinking
+        remove_thinking_sections = self._remove_thinking_sections
+        normalize_code_blocks = self._normalize_code_blocks
+        headings = _ROLE_HEADINGS
+        separator = _MESSAGE_SEPARATOR
+
+        def render(role: str, text: str) -> tuple[bytes, bytes, bytes] | None:
+            # Remove thinking sections if enabled
+            if remove_thinking and role == "model":
+                # Already stripped by _remove_thinking_sections()
+                text = remove_thinking_sections(text)
+                if not text:
+                    return None
+
+            # Format output based on role, with normalized code blocks
+            heading = headings.get(role) or f"**{role.capitalize()}:**\n\n".encode()
+            return heading, normalize_code_blocks(text).encode(), separator
+
+        return render
+
+    def _write_markdown(self, conversations: Iterable[dict], total: int) -> None:
+        """Render conversations and write the Markdown document.
+
+        Args:
+            conversations: Iterable of conversation dicts with 'role' and 'text'
+            total: Number of conversations reported in the document header
+        """
+        counter = self.message_counter = {"user": 0, "model": 0}
+        render = self._build_renderer()
+        headings = _ROLE_HEADINGS
+
+        # Same 0o666-minus-umask permissions that open(..., "w") would give
+        fd = os.open(self.output_md_file, _OUTPUT_FLAGS, 0o666)
+        try:
+            parts = [f"# Conversation Log\n\n> Total {total} messages\n\n---\n\n".encode()]
 
             # Process each conversation
             for conv in conversations:
-                role = conv.get("role", "unknown").lower()
-                text = conv.get("text", "").strip()
+                try:
+                    role, text = _get_role_and_text(conv)
+                except KeyError:
+                    role, text = conv.get("role", "unknown"), conv.get("text")
+
+                # Reject empty entries before paying for any string work
+                if not text:
+                    continue
 
-                # Skip empty conversations
+                # Skip whitespace-only conversations
+                text = text.strip()
                 if not text:
                     continue
 
-                # Remove thinking sections if enabled
-                if self.remove_thinking and role == "model":
-                    text = self._remove_thinking_sections(text)
+                # Exported roles are already lowercase; skip the copy lower() makes for them
+                if role not in headings:
+                    role = role.lower()
+                rendered = render(role, text)
 
                 # Skip if text is empty after thinking removal
-                if not text.strip():
+                if rendered is None:
                     continue
 
-                # Normalize code blocks
-                text = self._normalize_code_blocks(text)
-
                 # Increment counter
-                if role in self.message_counter:
-                    self.message_counter[role] += 1
-
-                # Format output based on role
-                if role == "user":
-                    self._write_user_message(f, text)
-                elif role == "model":
-                    self._write_assistant_message(f, text)
-                else:
-                    self._write_other_message(f, role, text)
+                if role in counter:
+                    counter[role] += 1
 
-        return self.output_md_file
+                parts.extend(rendered)
+
+                # Flush in batches so huge transcripts don't accumulate in memory
+                if len(parts) >= _WRITE_BATCH_SIZE:
+                    _write_all(fd, b"".join(parts))
+                    parts.clear()
 
-    def _write_user_message(self, f, text):
-        """Write user message in standard format."""
-        f.write("**Human:**\n\n")
-        f.write(text)
-        f.write("\n\n")
-        f.write("---\n---\n\n")
-
-    def _write_assistant_message(self, f, text):
-        """Write assistant message in standard format."""
-        f.write("**Assistant:**\n\n")
-        f.write(text)
-        f.write("\n\n")
-        f.write("---\n---\n\n")
-
-    def _write_other_message(self, f, role, text):
-        """Write other role message in standard format."""
-        f.write(f"**{role.capitalize()}:**\n\n")
-        f.write(text)
-        f.write("\n\n")
-        f.write("---\n---\n\n")
+            _write_all(fd, b"".join(parts))
+        finally:
+            os.close(fd)
 
     def get_stats(self) -> dict[str, int]:
         """Retrieve statistics from the conversion process.
@@ -1,29 +1,59 @@
 #!/usr/bin/env python3
 """Test code block detection"""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pytest
 
 from src.cleaners import JSONCleaner
 
+# (text, snippet, whether the snippet survives cleaning)
+CODE_DETECTION_CASES = (
+    # Pure text summary (should be kept)
+    pytest.param("Discussion:\n```\nAI summary\n```\nMore discussion", "AI summary", True, id="text-summary"),
+    # Python code (should be removed)
+    pytest.param("Code:\n```python\ndef hello():\n    print('world')\n```\nNote", "def hello", False, id="python"),
+    # JavaScript code (should be removed)
+    pytest.param("```javascript\nconst x = 1;\n```", "const x", False, id="javascript"),
+)
+
 
-def test_code_detection():
+@pytest.mark.parametrize(("text", "snippet", "kept"), CODE_DETECTION_CASES)
+def test_code_detection(text, snippet, kept):
     """Test code block detection in cleaner"""
-    cleaner = JSONCleaner("dummy.json", "dummy.json")
-
-    # Test case 1: Pure text summary (should be kept)
-    text1 = "Discussion:\n```\nAI summary\n```\nMore discussion"
-    result1 = cleaner._remove_code_blocks(text1)
-    assert "AI summary" in result1
-
-    # Test case 2: Python code (should be removed)
-    text2 = "Code:\n```python\ndef hello():\n    print('world')\n```\nNote"
-    result2 = cleaner._remove_code_blocks(text2)
-    assert "def hello" not in result2
-
-    # Test case 3: JavaScript code (should be removed)
-    text3 = "```javascript\nconst x = 1;\n```"
-    result3 = cleaner._remove_code_blocks(text3)
-    assert "const x" not in result3
+    # A classmethod, so no JSONCleaner instance is needed
+    result = JSONCleaner._remove_code_blocks(text)
+    assert (snippet in result) is kept
+
+
+# Fence edge cases, pinned to the output of the original regex implementation
+# (text, exact cleaned text)
+FENCE_EDGE_CASES = (
+    # No closing fence: nothing is removed
+    pytest.param(
+        "Intro\n```python\ndef f():\n    return 1\n", "Intro\n```python\ndef f():\n    return 1\n", id="unclosed"
+    ),
+    # Four-backtick opening with only a three-backtick close: the opening shrinks to match
+    pytest.param(
+        "Before\n````python\nimport os\nos.getcwd()\n```\nAfter", "Before\n\nAfter", id="four-open-three-close"
+    ),
+    pytest.param(
+        "Before\n````\nplain words here\n```\nAfter",
+        "Before\n`\nplain words here\nAfter",
+        id="four-open-three-close-text",
+    ),
+    # A lone run of seven backticks closes on itself
+    pytest.param("Look: ``````` done", "Look: ` done", id="seven-backtick-run"),
+)
+
+
+@pytest.mark.parametrize(("text", "expected"), FENCE_EDGE_CASES)
+def test_code_fence_edge_cases(text, expected):
+    """Test the fence scanner on unbalanced and oversized fences"""
+    assert JSONCleaner._remove_code_blocks(text) == expected
+
+
+def test_long_text_bypasses_code_block_cache():
+    """Test that texts over the cache cutoff are cleaned without being cached"""
+    text = "Notes\n```python\nimport os\n```\n" + "plain words " * 1000
+    before = JSONCleaner._cached_remove_code_blocks.cache_info().currsize
+    assert JSONCleaner._remove_code_blocks(text) == "Notes\n\n" + "plain words " * 1000
+    assert JSONCleaner._cached_remove_code_blocks.cache_info().currsize == before
@@ -5,28 +5,31 @@ Unit tests for ConvoSync toolkit
 
 import json
 import os
-import shutil
-import sys
-import tempfile
 from pathlib import Path
 
 import pytest
+from typer.testing import CliRunner
 
-# Ensure the parent directory is in the path
-parent_dir = str(Path(__file__).parent.parent)
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
-
+from convo_sync import app
 from src.cleaners import JSONCleaner
 from src.converters import MarkdownConverter
 
+# Two user messages and one model reply, shared by the stats tests
+STATS_DATA = {
+    "chunkedPrompt": {
+        "chunks": [
+            {"role": "user", "text": "msg1"},
+            {"role": "model", "text": "resp1"},
+            {"role": "user", "text": "msg2"},
+        ]
+    }
+}
+
 
 @pytest.fixture
-def temp_dir():
-    """Create temporary directory for test files"""
-    temp = tempfile.mkdtemp()
-    yield temp
-    shutil.rmtree(temp)
+def temp_dir(tmp_path):
+    """Temporary directory for test files, managed and cleaned up by pytest"""
+    return str(tmp_path)
 
 
 @pytest.fixture
@@ -35,13 +38,20 @@ def create_test_json(temp_dir):
 
     def _create_json(filename, data):
         filepath = os.path.join(temp_dir, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        Path(filepath).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
         return filepath
 
     return _create_json
 
 
+@pytest.fixture(scope="session")
+def stats_input(tmp_path_factory):
+    """STATS_DATA written to disk once and shared read-only by every test that needs it"""
+    filepath = tmp_path_factory.mktemp("fixtures") / "stats.json"
+    filepath.write_text(json.dumps(STATS_DATA), encoding="utf-8")
+    return str(filepath)
+
+
 # JSONCleaner Tests
 
 
@@ -63,8 +73,7 @@ def test_clean_fragmented_chunks(temp_dir, create_test_json):
     cleaner = JSONCleaner(input_file, output_file)
     cleaner.clean()
 
-    with open(output_file, encoding="utf-8") as f:
-        result = json.load(f)
+    result = json.loads(Path(output_file).read_bytes())
 
     assert "chunkedPrompt" in result
     assert len(result["chunkedPrompt"]["chunks"]) == 3
@@ -86,10 +95,7 @@ def test_clean_direct_text(temp_dir, create_test_json):
     output_file = os.path.join(temp_dir, "test_output.json")
 
     cleaner = JSONCleaner(input_file, output_file)
-    cleaner.clean()
-
-    with open(output_file, encoding="utf-8") as f:
-        result = json.load(f)
+    result = cleaner.clean()
 
     assert len(result["chunkedPrompt"]["chunks"]) == 2
     chunk0_text = result["chunkedPrompt"]["chunks"][0]["text"]
@@ -98,25 +104,15 @@ def test_clean_direct_text(temp_dir, create_test_json):
     assert chunk1_text == "Model response"
 
 
-def test_cleaner_get_stats(temp_dir, create_test_json):
-    """Test statistics gathering for JSONCleaner"""
-    test_data = {
-        "chunkedPrompt": {
-            "chunks": [
-                {"role": "user", "text": "msg1"},
-                {"role": "model", "text": "resp1"},
-                {"role": "user", "text": "msg2"},
-            ]
-        }
-    }
-
-    input_file = create_test_json("test_input.json", test_data)
+def test_cleaner_get_stats(temp_dir, stats_input):
+    """Test statistics gathering for JSONCleaner (in memory, no output file)"""
     output_file = os.path.join(temp_dir, "test_output.json")
 
-    cleaner = JSONCleaner(input_file, output_file)
-    cleaner.clean()
+    cleaner = JSONCleaner(stats_input, output_file)
+    cleaner.clean(save=False)
     stats = cleaner.get_stats()
 
+    assert not os.path.exists(output_file)
     assert stats["total"] == 3
     assert stats["users"] == 2
     assert stats["models"] == 1
@@ -142,16 +138,17 @@ def test_convert_to_markdown(temp_dir, create_test_json):
     converter = MarkdownConverter(input_file, output_file)
     converter.convert()
 
-    with open(output_file, encoding="utf-8") as f:
-        content = f.read()
+    content = Path(output_file).read_text(encoding="utf-8")
 
-    assert "**Human:**" in content
-    assert "**Assistant:**" in content
-    assert "Hello" in content
-    assert "Hi there!" in content
+    # The whole document is deterministic, so compare it exactly
+    assert content == (
+        "# Conversation Log\n\n> Total 2 messages\n\n---\n\n"
+        "**Human:**\n\nHello\n\n---\n---\n\n"
+        "**Assistant:**\n\nHi there!\n\n---\n---\n\n"
+    )
 
 
-def test_markdown_structure(temp_dir, create_test_json):
+def test_markdown_structure(temp_dir):
     """Test Markdown structure and formatting"""
     test_data = {
         "chunkedPrompt": {
@@ -162,42 +159,152 @@ def test_markdown_structure(temp_dir, create_test_json):
         }
     }
 
-    input_file = create_test_json("test_input.json", test_data)
     output_file = os.path.join(temp_dir, "test_output.md")
 
-    converter = MarkdownConverter(input_file, output_file)
+    converter = MarkdownConverter.from_data(test_data, output_file)
     converter.convert()
 
-    with open(output_file, encoding="utf-8") as f:
-        lines = f.readlines()
+    content = Path(output_file).read_text(encoding="utf-8")
 
     # Check for header
-    assert any("Conversation Log" in line for line in lines)
+    assert content.startswith("# Conversation Log\n")
     # Check for separators
-    assert any(line.strip().startswith("---") for line in lines)
+    assert "\n---\n" in content
 
 
-def test_converter_get_stats(temp_dir, create_test_json):
+def test_converter_get_stats(temp_dir):
     """Test statistics gathering for MarkdownConverter"""
+    output_file = os.path.join(temp_dir, "test_output.md")
+
+    converter = MarkdownConverter.from_data(STATS_DATA, output_file)
+    converter.convert()
+    stats = converter.get_stats()
+
+    assert stats["users"] == 2
+    assert stats["models"] == 1
+
+
+def test_convert_conversations_format(temp_dir, create_test_json):
+    """Test conversion of the standard 'conversations' format"""
+    test_data = {
+        "conversations": [
+            {"role": "User", "text": "Question"},
+            {"role": "model", "text": "**Planning**\n\nThinking it over\n\n\nAnswer"},
+            {"role": "system", "text": "Note"},
+        ]
+    }
+
+    input_file = create_test_json("test_input.json", test_data)
+    output_file = os.path.join(temp_dir, "test_output.md")
+
+    converter = MarkdownConverter(input_file, output_file)
+    converter.convert()
+
+    content = Path(output_file).read_text(encoding="utf-8")
+
+    assert "**Human:**\n\nQuestion" in content
+    assert "**Assistant:**\n\nAnswer" in content
+    assert "**System:**\n\nNote" in content
+    assert "Thinking it over" not in content
+    assert converter.get_stats() == {"users": 1, "models": 1, "total": 2}
+
+
+# Thinking-section edge cases, pinned to the output of the original regex implementation
+# (model text, exact text after thinking removal)
+THINKING_REMOVAL_CASES = (
+    # An extra leading asterisk stays behind; the title still matches from the second one
+    pytest.param("***Title**\n\nThinking here\n\n\nAnswer", "*Answer", id="triple-star-title"),
+    # A trailing section with no triple newline runs to the end of the text
+    pytest.param("Answer first\n\n**Reasoning**\n\nI should double check this", "Answer first", id="trailing-section"),
+    # A section ending right before a final newline is still removed
+    pytest.param("Answer\n\n**Check**\n\nLooks fine\n", "Answer", id="before-final-newline"),
+)
+
+
+@pytest.mark.parametrize(("text", "expected"), THINKING_REMOVAL_CASES)
+def test_remove_thinking_sections(temp_dir, text, expected):
+    """Test thinking removal on unusual titles and section endings"""
+    converter = MarkdownConverter.from_data({"conversations": []}, os.path.join(temp_dir, "test_output.md"))
+    assert converter._remove_thinking_sections(text) == expected
+
+
+def test_convert_unknown_format(temp_dir, create_test_json):
+    """Test that unrecognized JSON layouts are rejected"""
+    input_file = create_test_json("test_input.json", {"messages": []})
+
+    with pytest.raises(ValueError, match="JSON file format incorrect"):
+        MarkdownConverter(input_file, os.path.join(temp_dir, "test_output.md")).convert()
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_clean_stream_matches_full_load(temp_dir, create_test_json, indent):
+    """Test that streaming cleaning writes the same file as a full load"""
+    pytest.importorskip("ijson")
     test_data = {
         "chunkedPrompt": {
             "chunks": [
-                {"role": "user", "text": "msg1"},
-                {"role": "model", "text": "resp1"},
-                {"role": "user", "text": "msg2"},
+                {"role": "user", "text": "Hello"},
+                {"role": "model", "isThought": True, "text": "Thinking..."},
+                {"role": "model", "parts": [{"text": "Hi", "thought": True}, {"text": "Answer"}]},
+                {"driveDocument": {"id": "doc-1"}},
+            ]
+        },
+        "runSettings": {"temperature": 0.7},
+    }
+
+    input_file = create_test_json("test_input.json", test_data)
+    full_file = os.path.join(temp_dir, "full.json")
+    stream_file = os.path.join(temp_dir, "stream.json")
+
+    full_cleaner = JSONCleaner(input_file, full_file, indent=indent)
+    full_cleaner.clean()
+    stream_cleaner = JSONCleaner(input_file, stream_file, stream=True, indent=indent)
+    result = stream_cleaner.clean()
+
+    expected = Path(full_file).read_bytes()
+    assert Path(stream_file).read_bytes() == expected
+    assert result == {"runSettings": {"temperature": 0.7}}
+    assert stream_cleaner.get_stats() == full_cleaner.get_stats()
+
+
+def test_convert_stream_matches_full_load(temp_dir, create_test_json):
+    """Test that streaming conversion produces the same Markdown as a full load"""
+    pytest.importorskip("ijson")
+    test_data = {
+        "chunkedPrompt": {
+            "chunks": [
+                {"role": "user", "text": "Hello"},
+                {"role": "model", "parts": [{"text": "Hi"}, {"text": " there!"}]},
+                {"role": "user", "text": "   "},
             ]
         }
     }
 
     input_file = create_test_json("test_input.json", test_data)
-    output_file = os.path.join(temp_dir, "test_output.md")
+    full_file = os.path.join(temp_dir, "full.md")
+    stream_file = os.path.join(temp_dir, "stream.md")
 
-    converter = MarkdownConverter(input_file, output_file)
+    MarkdownConverter(input_file, full_file).convert()
+    converter = MarkdownConverter(input_file, stream_file, stream=True)
     converter.convert()
-    stats = converter.get_stats()
 
-    assert stats["users"] == 2
-    assert stats["models"] == 1
+    expected = Path(full_file).read_text(encoding="utf-8")
+    assert Path(stream_file).read_text(encoding="utf-8") == expected
+    assert "> Total 3 messages" in expected
+    assert converter.get_stats() == {"users": 1, "models": 1, "total": 2}
+
+
+def test_convert_retry_after_failed_open(temp_dir):
+    """Test that a convert() that couldn't open its output leaves nothing behind for the next one"""
+    output_dir = os.path.join(temp_dir, "missing")
+    converter = MarkdownConverter.from_data(STATS_DATA, os.path.join(output_dir, "out.md"))
+
+    with pytest.raises(FileNotFoundError):
+        converter.convert()
+
+    os.mkdir(output_dir)
+    content = Path(converter.convert()).read_text(encoding="utf-8")
+    assert content.count("# Conversation Log") == 1
 
 
 # Integration Tests
@@ -221,29 +328,149 @@ def test_full_pipeline(temp_dir, create_test_json):
         }
     }
 
-    input_file = os.path.join(temp_dir, "input.json")
-    with open(input_file, "w", encoding="utf-8") as f:
-        json.dump(test_data, f, ensure_ascii=False)
+    input_file = create_test_json("input.json", test_data)
 
     # Step 1: Clean
     clean_file = os.path.join(temp_dir, "clean.json")
     cleaner = JSONCleaner(input_file, clean_file)
-    cleaner.clean()
+    clean_data = cleaner.clean()
 
-    # Step 2: Convert
+    # Step 2: Convert the in-memory result, as the pipeline command does
     md_file = os.path.join(temp_dir, "output.md")
-    converter = MarkdownConverter(clean_file, md_file)
+    converter = MarkdownConverter.from_data(clean_data, md_file)
     converter.convert()
 
     # Verify outputs
-    with open(clean_file, encoding="utf-8") as f:
-        clean_data = json.load(f)
-
+    assert os.path.exists(clean_file)
     assert "chunkedPrompt" in clean_data
     assert len(clean_data["chunkedPrompt"]["chunks"]) >= 1
 
-    with open(md_file, encoding="utf-8") as f:
-        md_content = f.read()
+    md_content = Path(md_file).read_text(encoding="utf-8")
 
     assert "**Human:**" in md_content
     assert "**Assistant:**" in md_content
+
+
+def test_pipeline_in_memory(temp_dir, create_test_json):
+    """Test handing cleaned data to the converter without an intermediate file"""
+    test_data = {
+        "chunkedPrompt": {
+            "chunks": [
+                {"role": "user", "text": "Question"},
+                {"role": "model", "text": "Answer"},
+            ]
+        }
+    }
+
+    input_file = create_test_json("input.json", test_data)
+    clean_file = os.path.join(temp_dir, "clean.json")
+    disk_md = os.path.join(temp_dir, "disk.md")
+    memory_md = os.path.join(temp_dir, "memory.md")
+
+    cleaner = JSONCleaner(input_file, clean_file)
+    cleaned = cleaner.clean(save=False)
+    assert not os.path.exists(clean_file)
+    assert cleaner.get_stats()["total"] == 2
+
+    MarkdownConverter.from_data(cleaned, memory_md).convert()
+
+    cleaner.clean()
+    MarkdownConverter(clean_file, disk_md).convert()
+
+    assert Path(memory_md).read_text(encoding="utf-8") == Path(disk_md).read_text(encoding="utf-8")
+
+
+def test_pipeline_stream(temp_dir, create_test_json):
+    """Test that the streaming pipeline writes the same Markdown as the in-memory one"""
+    pytest.importorskip("ijson")
+    test_data = {
+        "chunkedPrompt": {
+            "chunks": [
+                {"role": "user", "text": "Hi"},
+                {"role": "model", "isThought": True, "text": "Thinking..."},
+                {"role": "model", "text": "Hello"},
+            ]
+        }
+    }
+    input_file = create_test_json("input.json", test_data)
+    full_md = os.path.join(temp_dir, "full.md")
+    stream_md = os.path.join(temp_dir, "stream.md")
+
+    runner = CliRunner()
+    result = runner.invoke(app, ["pipeline", input_file, "-m", full_md])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["pipeline", input_file, "-m", stream_md, "--stream"])
+    assert result.exit_code == 0, result.output
+
+    assert Path(full_md).read_text(encoding="utf-8") == Path(stream_md).read_text(encoding="utf-8")
+
+
+def test_batch_command(temp_dir, create_test_json):
+    """Test the batch command processes every input file"""
+    test_data = {"chunkedPrompt": {"chunks": [{"role": "user", "text": "Hi"}, {"role": "model", "text": "Hello"}]}}
+    inputs = [create_test_json(name, test_data) for name in ("a.json", "b.json")]
+
+    result = CliRunner().invoke(app, ["batch", *inputs, "--workers", "2"])
+
+    assert result.exit_code == 0, result.output
+    for name in ("a", "b"):
+        assert os.path.exists(os.path.join(temp_dir, f"{name}.cleaned.json"))
+        assert "**Assistant:**" in Path(os.path.join(temp_dir, f"{name}.md")).read_text(encoding="utf-8")
+
+
+def test_pipeline_skips_unchanged_input(temp_dir, create_test_json):
+    """Test that rerunning the pipeline on an unchanged input does no work"""
+    test_data = {"chunkedPrompt": {"chunks": [{"role": "user", "text": "Hi"}, {"role": "model", "text": "Hello"}]}}
+    input_file = create_test_json("input.json", test_data)
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert result.exit_code == 0, result.output
+    assert "Step 1" in result.output
+
+    # Unchanged input, even after a touch: skipped
+    os.utime(input_file)
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert result.exit_code == 0, result.output
+    assert "up to date" in result.output
+    assert "Step 1" not in result.output
+
+    # Different options, --force, a changed input or a missing output: rerun
+    for args in (["--keep-code"], ["--force"]):
+        result = runner.invoke(app, ["pipeline", input_file, *args])
+        assert "Step 1" in result.output
+
+    create_test_json("input.json", {"chunkedPrompt": {"chunks": [{"role": "user", "text": "Bye"}]}})
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert "Step 1" in result.output
+
+    os.remove(os.path.join(temp_dir, "input.md"))
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert "Step 1" in result.output
+
+    # An output rewritten outside the pipeline, e.g. by a manual clean: rerun
+    result = runner.invoke(app, ["clean", input_file, "--keep-code"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert "Step 1" in result.output
+
+
+def test_pipeline_cache_ignores_mid_run_edits(temp_dir, create_test_json, monkeypatch):
+    """Test that an input edited while the pipeline runs is not recorded as processed"""
+    input_file = create_test_json("input.json", {"chunkedPrompt": {"chunks": [{"role": "user", "text": "Old"}]}})
+    original_clean = JSONCleaner.clean
+
+    def clean_then_edit(self, save=True):
+        result = original_clean(self, save)
+        create_test_json("input.json", {"chunkedPrompt": {"chunks": [{"role": "user", "text": "New content"}]}})
+        return result
+
+    runner = CliRunner()
+    monkeypatch.setattr(JSONCleaner, "clean", clean_then_edit)
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert result.exit_code == 0, result.output
+    monkeypatch.undo()
+
+    result = runner.invoke(app, ["pipeline", input_file])
+    assert "Step 1" in result.output
+    assert "New content" in Path(temp_dir, "input.md").read_text(encoding="utf-8")